@@ -0,0 +1,183 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+import chess.pgn
+
+import graph_ai
+
+# Headless batch analysis: streams positions from EPD/FEN or PGN files,
+# searches them on a process pool and writes one JSON object per line.
+#
+#   python analyze.py positions.epd --depth 4 --processes 8 > results.jsonl
+#   python analyze.py games.pgn --movetime 0.5 --pgn-positions all -o out.jsonl
+#   python analyze.py positions.epd --static > evals.jsonl  # no search; needs numpy
+
+def json_score(score):
+    # Scores are from the side to move's point of view; mates are infinite.
+    if score == float('inf'):
+        return 'mate'
+    if score == -float('inf'):
+        return '-mate'
+    return int(score)
+
+def read_epd(path: str, lines):
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        position_id = f"{path}:{line_number}"
+        try:
+            board = chess.Board(line)
+        except ValueError:
+            try:
+                board, operations = chess.Board.from_epd(line)
+            except ValueError:
+                # Passed on as-is, so the analysis reports it as an error record.
+                yield position_id, line
+                continue
+            position_id = operations.get('id') or position_id
+        yield position_id, board.fen()
+
+def read_pgn(path: str, handle, every_position: bool):
+    game_number = 0
+    while True:
+        game = chess.pgn.read_game(handle)
+        if game is None:
+            return
+        game_number += 1
+        board = game.board()
+        if every_position:
+            yield f"{path}#{game_number}:0", board.fen()
+        for ply, move in enumerate(game.mainline_moves(), 1):
+            board.push(move)
+            if every_position:
+                yield f"{path}#{game_number}:{ply}", board.fen()
+        if not every_position:
+            yield f"{path}#{game_number}", board.fen()
+
+def read_positions(paths: list, every_pgn_position: bool):
+    for path in paths:
+        handle = sys.stdin if path == '-' else open(path, encoding='utf-8-sig')
+        try:
+            if path.lower().endswith('.pgn'):
+                yield from read_pgn(path, handle, every_pgn_position)
+            else:
+                yield from read_epd(path, handle)
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+def error_record(position_id: str, fen: str, error: Exception) -> dict:
+    return {'id': position_id, 'fen': fen, 'error': f"{type(error).__name__}: {error}"}
+
+def analyse_position(position_id: str, fen: str, depth: int, movetime: float) -> dict:
+    # One bad record must not end a long run, so failures become error records.
+    try:
+        return search_position(position_id, fen, depth, movetime)
+    except Exception as error:
+        return error_record(position_id, fen, error)
+
+def search_position(position_id: str, fen: str, depth: int, movetime: float) -> dict:
+    # Workers handle many unrelated positions; starting each one from empty
+    # tables keeps the output independent of the pool size and scheduling.
+    graph_ai.reset_engine()
+    board = chess.Board(fen)
+    start = time.monotonic()
+    if movetime is not None:
+        best_move, move_evals = graph_ai.search(board, movetime=movetime, max_depth=depth or 64)
+    else:
+        best_move, move_evals = graph_ai.find_best_move(board, depth)
+    stats = graph_ai.search_stats.as_dict()
+    return {
+        'id': position_id,
+        'fen': fen,
+        'best_move': best_move.uci() if best_move else None,
+        'best_move_san': board.san(best_move) if best_move else None,
+        'eval': json_score(move_evals[0][1]) if move_evals else None,
+        # Only the best move is searched with an open window; the other root
+        # scores are fail-hard upper bounds.
+        'move_evals': [[san, json_score(score), 'exact' if index == 0 else 'upper']
+                       for index, (san, score) in enumerate(move_evals)],
+        'depth': stats['depth'],
+        'nodes': stats['nodes'],
+        'time': round(time.monotonic() - start, 4),
+    }
+
+def analyse_stream(positions, depth: int, movetime: float, processes: int = None):
+    # Keeps only a bounded window of positions in flight, and yields the
+    # results in input order.
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        window = 2 * processes
+        pending = deque()
+        for position_id, fen in positions:
+            pending.append((position_id, fen, pool.submit(analyse_position, position_id, fen, depth, movetime)))
+            if len(pending) >= window:
+                yield collect_result(*pending.popleft())
+        while pending:
+            yield collect_result(*pending.popleft())
+
+def collect_result(position_id: str, fen: str, future) -> dict:
+    # Worker-side failures (e.g. a crashed process) become error records too.
+    try:
+        return future.result()
+    except Exception as error:
+        return error_record(position_id, fen, error)
+
+STATIC_BATCH_SIZE = 4096
+
+def analyse_static(positions, batch_size: int = STATIC_BATCH_SIZE):
+    # Static material/PST/pawn scores, evaluated a batch at a time with numpy.
+    import batch_eval
+    for batch in iter(lambda: list(itertools.islice(positions, batch_size)), []):
+        boards, errors = [], {}
+        for index, (position_id, fen) in enumerate(batch):
+            try:
+                boards.append(chess.Board(fen))
+            except ValueError as error:
+                errors[index] = error_record(position_id, fen, error)
+        scores = iter(batch_eval.evaluate_batch(boards))
+        for index, (position_id, fen) in enumerate(batch):
+            yield errors[index] if index in errors else {'id': position_id, 'fen': fen, 'eval': int(next(scores))}
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Analyse EPD/FEN/PGN positions with graph_ai and write JSONL.")
+    parser.add_argument('inputs', nargs='+', help="EPD/FEN files (one position per line) or .pgn files; '-' reads stdin")
+    parser.add_argument('--depth', type=int, help="search depth (default 4; maximum depth with --movetime)")
+    parser.add_argument('--movetime', type=float, help="seconds per position, using iterative deepening")
+    parser.add_argument('--static', action='store_true',
+                        help="write vectorized static evaluations instead of searching (requires numpy)")
+    parser.add_argument('--processes', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--pgn-positions', choices=['final', 'all'], default='final',
+                        help="analyse each game's final position or every mainline position")
+    parser.add_argument('--limit', type=int, help="stop after this many positions")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    if args.depth is None and args.movetime is None:
+        args.depth = 4
+
+    positions = read_positions(args.inputs, args.pgn_positions == 'all')
+    if args.limit is not None:
+        positions = itertools.islice(positions, args.limit)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.static:
+            results = analyse_static(iter(positions))
+        else:
+            results = analyse_stream(positions, args.depth, args.movetime, args.processes)
+        for result in results:
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == '__main__':
+    main()
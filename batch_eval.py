@@ -0,0 +1,90 @@
+import chess
+import numpy as np
+
+import graph_ai
+
+# Vectorized material + PST + pawn-structure evaluation over many boards at
+# once, for scoring large position sets:
+#
+#   scores = evaluate_batch(boards)          # side to move's point of view
+#   children = score_children(board)         # [(move, score), ...]
+#
+# Positions are turned into 12x64 piece planes (white pawn..king, then black
+# pawn..king). The terms match graph_ai.evaluate_position; mobility, centre
+# control, king safety and the knight outpost/tropism terms are per-piece
+# and are left to the search.
+
+PLANE_COLORS = [chess.WHITE] * 6 + [chess.BLACK] * 6
+PLANE_TYPES = list(chess.PIECE_TYPES) * 2
+
+PLANE_VALUES = np.array([graph_ai.PIECE_VALUES[piece_type] for piece_type in PLANE_TYPES], dtype=np.int64)
+PLANE_SIGNS = np.array([1 if color == chess.WHITE else -1 for color in PLANE_COLORS], dtype=np.int64)
+# Non-pawn, non-king material, used for the MG/EG split.
+PHASE_VALUES = np.array([
+    0 if piece_type in (chess.PAWN, chess.KING) else graph_ai.PIECE_VALUES[piece_type]
+    for piece_type in PLANE_TYPES
+], dtype=np.int64)
+PST_MG_PLANES = np.array([graph_ai.PST_MG[color][piece_type] for color, piece_type in zip(PLANE_COLORS, PLANE_TYPES)], dtype=np.int64)
+PST_EG_PLANES = np.array([graph_ai.PST_EG[color][piece_type] for color, piece_type in zip(PLANE_COLORS, PLANE_TYPES)], dtype=np.int64)
+
+WHITE_PAWNS, BLACK_PAWNS = 0, 6
+SQUARE_BITS = np.arange(64, dtype=np.uint64)
+
+def board_bitboards(board: chess.Board) -> list:
+    # The 12 piece bitboards in plane order.
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    pieces = [board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+    return [bb & white for bb in pieces] + [bb & black for bb in pieces]
+
+def bitboards_to_planes(bitboards) -> np.ndarray:
+    # (N, 12) bitboards -> (N, 12, 64) 0/1 planes, bit i being square i.
+    bitboards = np.asarray(bitboards, dtype=np.uint64)
+    return ((bitboards[..., None] >> SQUARE_BITS) & np.uint64(1)).astype(np.uint8)
+
+def board_planes(boards: list) -> np.ndarray:
+    return bitboards_to_planes([board_bitboards(board) for board in boards])
+
+def pawn_structure_penalties(pawn_planes: np.ndarray) -> np.ndarray:
+    # (N, 64) pawn planes -> (N,) doubled + isolated pawn penalties.
+    file_counts = pawn_planes.reshape(-1, 8, 8).sum(axis=1, dtype=np.int64)
+    doubled = np.maximum(file_counts - 1, 0).sum(axis=1) * 20
+    occupied = file_counts > 0
+    neighbours = np.zeros_like(occupied)
+    neighbours[:, 1:] |= occupied[:, :-1]
+    neighbours[:, :-1] |= occupied[:, 1:]
+    isolated = np.where(neighbours, 0, file_counts).sum(axis=1) * 15
+    return doubled + isolated
+
+def evaluate_planes(planes: np.ndarray, white_to_move) -> np.ndarray:
+    # White-minus-black score, negated where black is to move.
+    counts = planes.sum(axis=2, dtype=np.int64)
+    material = counts @ (PLANE_VALUES * PLANE_SIGNS)
+    endgame = counts @ PHASE_VALUES < 2000
+    signed_planes = planes * PLANE_SIGNS[None, :, None]
+    pst_mg = np.einsum('nps,ps->n', signed_planes, PST_MG_PLANES)
+    pst_eg = np.einsum('nps,ps->n', signed_planes, PST_EG_PLANES)
+    pawns = pawn_structure_penalties(planes[:, BLACK_PAWNS]) - pawn_structure_penalties(planes[:, WHITE_PAWNS])
+    total = material + np.where(endgame, pst_eg, pst_mg) + pawns
+    return np.where(np.asarray(white_to_move, dtype=bool), total, -total)
+
+def evaluate_batch(boards: list) -> np.ndarray:
+    if not boards:
+        return np.zeros(0, dtype=np.int64)
+    return evaluate_planes(board_planes(boards), [board.turn == chess.WHITE for board in boards])
+
+def score_children(board: chess.Board, moves: list = None) -> list:
+    # Scores every child of board in one batch, from the point of view of the
+    # side to move at board, best first. Children are read off with push/pop
+    # rather than copied.
+    moves = list(board.legal_moves) if moves is None else moves
+    if not moves:
+        return []
+    rows = []
+    for move in moves:
+        board.push(move)
+        rows.append(board_bitboards(board))
+        board.pop()
+    child_white_to_move = np.full(len(moves), board.turn == chess.BLACK)
+    scores = -evaluate_planes(bitboards_to_planes(rows), child_white_to_move)
+    order = np.argsort(-scores, kind='stable')
+    return [(moves[index], int(scores[index])) for index in order]
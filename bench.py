@@ -0,0 +1,160 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import chess
+import chess.polyglot
+
+import graph_ai
+
+try:
+    import batch_eval
+except ImportError: # numpy is optional
+    batch_eval = None
+
+# Reproducible engine benchmark:
+#
+#   python bench.py                          # search + microbenchmarks
+#   python bench.py --depth 5 --json out.json
+#   python bench.py --compare out.json       # flag node/nps changes
+#
+# The search bench clears all engine tables before each position, so the
+# node-count signature only changes when search or evaluation behaviour
+# changes. nps and the microbenchmarks depend on the machine.
+
+BENCH_POSITIONS = [
+    ('opening', chess.STARTING_FEN),
+    ('italian', "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"),
+    ('queens-gambit', "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 9"),
+    ('tactical-pins', "r2q1rk1/ppp2ppp/2np1n2/2b1p1B1/2B1P1b1/2NP1N2/PPP2PPP/R2Q1RK1 w - - 6 8"),
+    ('kiwipete', "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ('rook-endgame', "8/5pk1/6p1/8/3R4/6P1/5PK1/3r4 w - - 0 1"),
+    ('pawn-endgame', "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    ('king-pawn', "8/8/4k3/8/2K5/3P4/8/8 w - - 0 1"),
+]
+
+def bench_search(depth: int) -> dict:
+    positions = []
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen in BENCH_POSITIONS:
+        graph_ai.reset_engine()
+        board = chess.Board(fen)
+        nodes, elapsed, time_to_depth = 0, 0.0, []
+        best_move = None
+        for iteration in range(1, depth + 1):
+            best_move, _ = graph_ai.find_best_move(board, iteration)
+            stats = graph_ai.search_stats.as_dict()
+            nodes += stats['nodes']
+            elapsed += stats['time']
+            time_to_depth.append(round(elapsed, 4))
+        positions.append({
+            'name': name, 'fen': fen, 'best_move': best_move.uci() if best_move else None,
+            'nodes': nodes, 'time': round(elapsed, 4), 'time_to_depth': time_to_depth,
+        })
+        total_nodes += nodes
+        total_time += elapsed
+    return {
+        'depth': depth,
+        'positions': positions,
+        'nodes': total_nodes,
+        'time': round(total_time, 4),
+        'nps': int(total_nodes / total_time) if total_time > 0 else 0,
+        'signature': total_nodes,
+    }
+
+def time_per_call(fn, items: list, min_time: float) -> float:
+    # Repeats fn over items until min_time has passed; returns ns per call.
+    calls, start = 0, time.perf_counter()
+    while True:
+        for item in items:
+            fn(item)
+        calls += len(items)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed * 1e9 / calls
+
+def bench_micro(min_time: float) -> dict:
+    boards = [chess.Board(fen) for _, fen in BENCH_POSITIONS]
+    engine_boards = [graph_ai.EngineBoard(fen) for _, fen in BENCH_POSITIONS]
+    move_pairs = [(move, board) for board in boards for move in board.legal_moves]
+    engine_moves = [(board, move) for board in engine_boards for move in board.legal_moves]
+
+    def push_pop(item):
+        board, move = item
+        board.push(move)
+        board.pop()
+
+    results = {
+        'evaluate_board': time_per_call(graph_ai.evaluate_board, boards, min_time),
+        'evaluate_board_engine_board': time_per_call(graph_ai.evaluate_board, engine_boards, min_time),
+        'evaluate_position_engine_board': time_per_call(graph_ai.evaluate_position, engine_boards, min_time),
+        'score_move': time_per_call(lambda pair: graph_ai.score_move(*pair), move_pairs, min_time),
+        'legal_moves': time_per_call(lambda board: list(board.legal_moves), boards, min_time),
+        'legal_captures': time_per_call(lambda board: list(board.generate_legal_captures()), boards, min_time),
+        'zobrist_hash': time_per_call(chess.polyglot.zobrist_hash, boards, min_time),
+        'engine_board_push_pop': time_per_call(push_pop, engine_moves, min_time),
+    }
+    if batch_eval is not None:
+        # Per board, so it reads against evaluate_board.
+        results['evaluate_batch_per_board'] = time_per_call(batch_eval.evaluate_batch, [boards], min_time) / len(boards)
+    return {name: {'ns_per_call': round(ns, 1)} for name, ns in results.items()}
+
+def compare(result: dict, baseline: dict) -> list:
+    lines = []
+    old_search, new_search = baseline.get('search'), result.get('search')
+    if old_search and new_search:
+        if old_search['depth'] != new_search['depth']:
+            lines.append(f"depth differs: baseline {old_search['depth']}, now {new_search['depth']}")
+        elif old_search['signature'] != new_search['signature']:
+            lines.append(f"signature changed: {old_search['signature']} -> {new_search['signature']} (search behaviour changed)")
+        else:
+            lines.append(f"signature unchanged: {new_search['signature']}")
+        if old_search['nps']:
+            change = 100.0 * (new_search['nps'] - old_search['nps']) / old_search['nps']
+            lines.append(f"nps: {old_search['nps']} -> {new_search['nps']} ({change:+.1f}%)")
+    for name, entry in result.get('micro', {}).items():
+        old = baseline.get('micro', {}).get(name)
+        if old:
+            change = 100.0 * (entry['ns_per_call'] - old['ns_per_call']) / old['ns_per_call']
+            lines.append(f"{name}: {old['ns_per_call']:.0f} -> {entry['ns_per_call']:.0f} ns ({change:+.1f}%)")
+    return lines
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark graph_ai search speed and core operations.")
+    parser.add_argument('--depth', type=int, default=4, help="search depth per position (default 4)")
+    parser.add_argument('--micro-time', type=float, default=0.5, help="seconds per microbenchmark")
+    parser.add_argument('--no-search', action='store_true', help="skip the search benchmark")
+    parser.add_argument('--no-micro', action='store_true', help="skip the microbenchmarks")
+    parser.add_argument('--json', help="write results as JSON to this file ('-' for stdout)")
+    parser.add_argument('--compare', help="JSON file from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    log = sys.stderr if args.json == '-' else sys.stdout
+    result = {'python': platform.python_version(), 'chess': chess.__version__}
+    if not args.no_search:
+        result['search'] = bench_search(args.depth)
+        for position in result['search']['positions']:
+            print(f"{position['name']:<16} {position['best_move']:<6} nodes {position['nodes']:>8} "
+                  f"time {position['time']:>8.3f}s", file=log)
+        print(f"Total nodes {result['search']['nodes']}  time {result['search']['time']:.3f}s  "
+              f"nps {result['search']['nps']}  signature {result['search']['signature']}", file=log)
+    if not args.no_micro:
+        result['micro'] = bench_micro(args.micro_time)
+        for name, entry in result['micro'].items():
+            print(f"{name:<32} {entry['ns_per_call']:>12.0f} ns/call", file=log)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            for line in compare(result, json.load(handle)):
+                print(line, file=log)
+    if args.json == '-':
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(result, handle, indent=2)
+
+if __name__ == '__main__':
+    main()
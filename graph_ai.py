@@ -1,8 +1,15 @@
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait
+
 import chess
 import chess.polyglot
-
-# The Transposition Table (our AI's memory)
-transposition_table = {}
+import chess.syzygy
 
 PIECE_VALUES = {
     chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330,
@@ -98,11 +105,30 @@ def calculate_material_score(board: chess.Board, color: chess.Color) -> int:
             score += PIECE_VALUES.get(piece.piece_type, 0)
     return score
 
+# Evaluation switches. 'mobility' is 'attacks' (pseudo-legal attack counts,
+# cheap) or 'legal' (full legal move generation for both sides).
+EVAL_CONFIG = {
+    'mobility': 'attacks',
+}
+
+MOBILITY_WEIGHTS = {
+    chess.PAWN: 0, chess.KNIGHT: 1, chess.BISHOP: 1,
+    chess.ROOK: 1, chess.QUEEN: 1, chess.KING: 1
+}
+
 def calculate_mobility_score(board: chess.Board, color: chess.Color) -> int:
-    original_turn = board.turn
-    board.turn = color
-    mobility = board.legal_moves.count()
-    board.turn = original_turn
+    if board.turn != color:
+        board = board.copy(stack=False)
+        board.turn = color
+    return board.legal_moves.count()
+
+def calculate_attack_mobility_score(board: chess.Board, color: chess.Color) -> int:
+    not_own = ~board.occupied_co[color]
+    mobility = 0
+    for piece_type, weight in MOBILITY_WEIGHTS.items():
+        if weight:
+            for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                mobility += weight * chess.popcount(board.attacks_mask(square) & not_own)
     return mobility
 
 def calculate_center_control_score(board: chess.Board, color: chess.Color) -> int:
@@ -129,59 +155,340 @@ def calculate_king_safety_score(board: chess.Board, color: chess.Color) -> int:
         attack_score += len(board.attackers(opponent_color, square))
     return attack_score
 
+ADJACENT_FILES = [
+    (chess.BB_FILES[f - 1] if f > 0 else 0) | (chess.BB_FILES[f + 1] if f < 7 else 0)
+    for f in range(8)
+]
+
 def calculate_doubled_pawn_penalty(board: chess.Board, color: chess.Color) -> int:
+    pawns = board.pawns & board.occupied_co[color]
     penalty = 0
-    pawn_char = 'P' if color == chess.WHITE else 'p'
-    for file_index in range(8):
-        pawn_count = 0
-        for rank_index in range(8):
-            square = chess.square(file_index, rank_index)
-            piece = board.piece_at(square)
-            if piece and piece.symbol() == pawn_char:
-                pawn_count += 1
+    for file_mask in chess.BB_FILES:
+        pawn_count = chess.popcount(pawns & file_mask)
         if pawn_count > 1:
             penalty += (pawn_count - 1) * 20
     return penalty
 
 def calculate_isolated_pawn_penalty(board: chess.Board, color: chess.Color) -> int:
+    pawns = board.pawns & board.occupied_co[color]
     penalty = 0
-    pawn_char = 'P' if color == chess.WHITE else 'p'
-    for file_index in range(8):
-        for rank_index in range(8):
-            square = chess.square(file_index, rank_index)
-            piece = board.piece_at(square)
-            if piece and piece.symbol() == pawn_char:
-                is_isolated = True
-                if file_index > 0:
-                    for r in range(8):
-                        adj_square = chess.square(file_index - 1, r)
-                        if board.piece_at(adj_square) and board.piece_at(adj_square).symbol() == pawn_char:
-                            is_isolated = False; break
-                if not is_isolated: continue
-                if file_index < 7:
-                    for r in range(8):
-                        adj_square = chess.square(file_index + 1, r)
-                        if board.piece_at(adj_square) and board.piece_at(adj_square).symbol() == pawn_char:
-                            is_isolated = False; break
-                if is_isolated:
-                    penalty += 15
+    for file_index, file_mask in enumerate(chess.BB_FILES):
+        file_pawns = pawns & file_mask
+        if file_pawns and not pawns & ADJACENT_FILES[file_index]:
+            penalty += chess.popcount(file_pawns) * 15
     return penalty
 
+# Knight-move graph: all-pairs distances and BFS predecessors, built once at
+# import. KNIGHT_PREDECESSOR[start][square] is the square before square on a
+# shortest knight path from start.
+def build_knight_tables() -> (list, list):
+    distance = [[-1] * 64 for _ in chess.SQUARES]
+    predecessor = [[None] * 64 for _ in chess.SQUARES]
+    for start in chess.SQUARES:
+        distance[start][start] = 0
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for square in frontier:
+                for target in chess.scan_forward(chess.BB_KNIGHT_ATTACKS[square]):
+                    if distance[start][target] < 0:
+                        distance[start][target] = distance[start][square] + 1
+                        predecessor[start][target] = square
+                        next_frontier.append(target)
+            frontier = next_frontier
+    return distance, predecessor
+
+KNIGHT_DISTANCE, KNIGHT_PREDECESSOR = build_knight_tables()
+# KNIGHT_RINGS[square][d]: squares exactly d knight moves from square.
+KNIGHT_RINGS = [
+    [sum(chess.BB_SQUARES[target] for target in chess.SQUARES if KNIGHT_DISTANCE[square][target] == d) for d in range(7)]
+    for square in chess.SQUARES
+]
+
+def knight_path(start: chess.Square, end: chess.Square) -> list:
+    # A shortest knight path from start to end, both included.
+    path = [end]
+    while path[-1] != start:
+        path.append(KNIGHT_PREDECESSOR[start][path[-1]])
+    path.reverse()
+    return path
+
+# Squares in front of a pawn on the adjacent files, i.e. everything that
+# pawn can still attack as it advances.
+PAWN_ATTACK_SPAN = {color: [0] * 64 for color in chess.COLORS}
+for _square in chess.SQUARES:
+    _rank = chess.square_rank(_square)
+    _ahead = {
+        chess.WHITE: sum(chess.BB_RANKS[r] for r in range(_rank + 1, 8)),
+        chess.BLACK: sum(chess.BB_RANKS[r] for r in range(0, _rank)),
+    }
+    for _color in chess.COLORS:
+        PAWN_ATTACK_SPAN[_color][_square] = ADJACENT_FILES[chess.square_file(_square)] & _ahead[_color]
+OUTPOST_RANKS = {
+    chess.WHITE: chess.BB_RANK_4 | chess.BB_RANK_5 | chess.BB_RANK_6,
+    chess.BLACK: chess.BB_RANK_3 | chess.BB_RANK_4 | chess.BB_RANK_5,
+}
+
+def calculate_outposts(board: chess.Board, color: chess.Color) -> int:
+    # Squares in the opponent's half that an own pawn defends and no enemy
+    # pawn can ever attack. Depends only on the pawns.
+    own_pawns = board.pawns & board.occupied_co[color]
+    enemy_pawns = board.pawns & board.occupied_co[not color]
+    defended = 0
+    for square in chess.scan_forward(own_pawns):
+        defended |= chess.BB_PAWN_ATTACKS[color][square]
+    enemy_span = 0
+    for square in chess.scan_forward(enemy_pawns):
+        enemy_span |= PAWN_ATTACK_SPAN[not color][square]
+    return OUTPOST_RANKS[color] & defended & ~enemy_span
+
+def pawn_zobrist_key(board: chess.Board) -> int:
+    # Polyglot keys for pawns only; piece index 0 is a black pawn, 1 a white pawn.
+    key = 0
+    for color in chess.COLORS:
+        for square in chess.scan_forward(board.pawns & board.occupied_co[color]):
+            key ^= chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * color + square]
+    return key
+
+class PawnHashTable:
+    # Fixed-size, always-replace cache of pawn-structure penalties keyed by
+    # the pawn-only Zobrist key. Sibling nodes almost always share pawns.
+
+    def __init__(self, size: int = 1 << 14) -> None:
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.values = [None] * size
+        self.hits = self.probes = 0
+
+    def probe(self, key: int):
+        self.probes += 1
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        return None
+
+    def store(self, key: int, value) -> None:
+        index = key & self.mask
+        self.keys[index] = key
+        self.values[index] = value
+
+    def clear(self) -> None:
+        self.keys = [None] * (self.mask + 1)
+        self.values = [None] * (self.mask + 1)
+        self.hits = self.probes = 0
+
+pawn_hash_table = PawnHashTable()
+
+def probe_pawn_structure(board: chess.Board) -> (int, int, int, int):
+    # (white penalty, black penalty, white outposts, black outposts).
+    key = board.pawn_key if isinstance(board, EngineBoard) else pawn_zobrist_key(board)
+    structure = pawn_hash_table.probe(key)
+    if structure is None:
+        structure = (
+            calculate_doubled_pawn_penalty(board, chess.WHITE) + calculate_isolated_pawn_penalty(board, chess.WHITE),
+            calculate_doubled_pawn_penalty(board, chess.BLACK) + calculate_isolated_pawn_penalty(board, chess.BLACK),
+            calculate_outposts(board, chess.WHITE),
+            calculate_outposts(board, chess.BLACK),
+        )
+        pawn_hash_table.store(key, structure)
+    return structure
+
+OUTPOST_BONUS = [20, 10, 5] # Knight on an outpost, or one/two moves from a free one
+KNIGHT_TROPISM = [0, 15, 10, 5, 0, 0, 0] # By knight distance to the enemy king
+
+def calculate_knight_score(board: chess.Board, color: chess.Color, outposts: int) -> int:
+    knights = board.knights & board.occupied_co[color]
+    if not knights: return 0
+    enemy_king = board.king(not color)
+    free_outposts = outposts & ~board.occupied_co[color]
+    score = 0
+    for square in chess.scan_forward(knights):
+        if enemy_king is not None:
+            score += KNIGHT_TROPISM[KNIGHT_DISTANCE[square][enemy_king]]
+        rings = KNIGHT_RINGS[square]
+        if outposts & rings[0]:
+            score += OUTPOST_BONUS[0]
+        elif free_outposts & rings[1]:
+            score += OUTPOST_BONUS[1]
+        elif free_outposts & rings[2]:
+            score += OUTPOST_BONUS[2]
+    return score
+
+# Per-colour PST lookups, already mirrored for black, so the incremental
+# evaluator can index them directly by square.
+PST_MG = {color: {} for color in chess.COLORS}
+PST_EG = {color: {} for color in chess.COLORS}
+for _color in chess.COLORS:
+    for _piece_type in chess.PIECE_TYPES:
+        if _piece_type == chess.KING:
+            _mg, _eg = PST['KING_MG'], PST['KING_EG']
+        else:
+            _mg = _eg = PST[_piece_type]
+        _squares = chess.SQUARES if _color == chess.WHITE else [chess.square_mirror(sq) for sq in chess.SQUARES]
+        PST_MG[_color][_piece_type] = [_mg[sq] for sq in _squares]
+        PST_EG[_color][_piece_type] = [_eg[sq] for sq in _squares]
+
+ZOBRIST = chess.polyglot.ZobristHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+
+class EngineBoard(chess.Board):
+    # A chess.Board that keeps material, PST, game-phase, pawn-key and
+    # Zobrist-key accumulators up to date as pieces are placed and removed,
+    # so evaluation and hashing never rescan the board. push() snapshots the
+    # accumulators and pop() restores them. Setters other than push/pop
+    # (set_fen, set_piece_at, ...) need refresh().
+
+    def __init__(self, fen: str = chess.STARTING_FEN, *, chess960: bool = False) -> None:
+        self._material = [0, 0]
+        self._pst_mg = [0, 0]
+        self._pst_eg = [0, 0]
+        self._phase_material = 0
+        self._piece_key = 0
+        self.pawn_key = 0
+        self.zobrist_key = 0
+        self._eval_stack = []
+        self._key_history = []
+        super().__init__(fen, chess960=chess960)
+        self.refresh()
+
+    @classmethod
+    def from_board(cls, board: chess.Board) -> 'EngineBoard':
+        engine_board = cls(board.fen(), chess960=board.chess960)
+        engine_board.move_stack = board.move_stack.copy()
+        engine_board._stack = board._stack.copy()
+        # Keys of the positions since the last irreversible move are enough
+        # for repetition detection; older entries stay unknown (None).
+        replay, keys = board.copy(), []
+        for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+            replay.pop()
+            keys.append(chess.polyglot.zobrist_hash(replay))
+        keys.reverse()
+        engine_board._key_history = [None] * (len(board.move_stack) - len(keys)) + keys
+        return engine_board
+
+    def refresh(self) -> None:
+        self._material = [0, 0]
+        self._pst_mg = [0, 0]
+        self._pst_eg = [0, 0]
+        self._phase_material = 0
+        self._piece_key = 0
+        self.pawn_key = 0
+        for square, piece in self.piece_map().items():
+            self._add_piece(square, piece.piece_type, piece.color)
+        self.zobrist_key = self._piece_key ^ self._state_key()
+
+    def _state_key(self) -> int:
+        return ZOBRIST.hash_castling(self) ^ ZOBRIST.hash_ep_square(self) ^ ZOBRIST.hash_turn(self)
+
+    def _add_piece(self, square: chess.Square, piece_type: chess.PieceType, color: chess.Color) -> None:
+        value = PIECE_VALUES[piece_type]
+        self._material[color] += value
+        self._pst_mg[color] += PST_MG[color][piece_type][square]
+        self._pst_eg[color] += PST_EG[color][piece_type][square]
+        self._piece_key ^= chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * (2 * piece_type - 2 + color) + square]
+        if piece_type == chess.PAWN:
+            self.pawn_key ^= chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * color + square]
+        elif piece_type != chess.KING:
+            self._phase_material += value
+
+    def _remove_piece_at(self, square: chess.Square):
+        color = bool(self.occupied_co[chess.WHITE] & chess.BB_SQUARES[square])
+        piece_type = super()._remove_piece_at(square)
+        if piece_type:
+            value = PIECE_VALUES[piece_type]
+            self._material[color] -= value
+            self._pst_mg[color] -= PST_MG[color][piece_type][square]
+            self._pst_eg[color] -= PST_EG[color][piece_type][square]
+            self._piece_key ^= chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * (2 * piece_type - 2 + color) + square]
+            if piece_type == chess.PAWN:
+                self.pawn_key ^= chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * color + square]
+            elif piece_type != chess.KING:
+                self._phase_material -= value
+        return piece_type
+
+    def _set_piece_at(self, square: chess.Square, piece_type: chess.PieceType, color: chess.Color, promoted: bool = False) -> None:
+        super()._set_piece_at(square, piece_type, color, promoted)
+        self._add_piece(square, piece_type, color)
+
+    def push(self, move: chess.Move) -> None:
+        self._eval_stack.append((
+            self._material.copy(), self._pst_mg.copy(), self._pst_eg.copy(),
+            self._phase_material, self.pawn_key, self._piece_key,
+        ))
+        self._key_history.append(self.zobrist_key)
+        super().push(move)
+        self.zobrist_key = self._piece_key ^ self._state_key()
+
+    def pop(self) -> chess.Move:
+        move = super().pop()
+        key = self._key_history.pop() if self._key_history else None
+        if self._eval_stack and key is not None:
+            (self._material, self._pst_mg, self._pst_eg,
+             self._phase_material, self.pawn_key, self._piece_key) = self._eval_stack.pop()
+            self.zobrist_key = key
+        else:
+            self._eval_stack.clear()
+            self.refresh()
+        return move
+
+    def copy(self, *, stack=True) -> 'EngineBoard':
+        board = super().copy(stack=stack)
+        board.refresh()
+        if stack and board.move_stack:
+            board._eval_stack = self._eval_stack[-len(board.move_stack):]
+            board._key_history = self._key_history[-len(board.move_stack):]
+        return board
+
+    def is_repetition(self, count: int = 3) -> bool:
+        # Compares the keys of earlier positions with the same side to move
+        # instead of replaying the move stack.
+        keys = self._key_history
+        seen = 1
+        for index in range(len(keys) - 2, max(0, len(keys) - self.halfmove_clock) - 1, -2):
+            if keys[index] is None:
+                return super().is_repetition(count)
+            if keys[index] == self.zobrist_key:
+                seen += 1
+                if seen >= count:
+                    return True
+        return False
+
+    def material_pst_score(self, color: chess.Color) -> int:
+        pst = self._pst_eg if self._phase_material < 2000 else self._pst_mg
+        return self._material[color] + pst[color]
+
+def position_key(board: chess.Board) -> int:
+    return board.zobrist_key if isinstance(board, EngineBoard) else chess.polyglot.zobrist_hash(board)
+
 def evaluate_board(board: chess.Board) -> int:
-    if board.is_checkmate():
-        return -float('inf') if board.outcome().winner != board.turn else float('inf')
-    if board.is_game_over():
-        return 0
+    outcome = board.outcome()
+    if outcome:
+        if outcome.winner is None:
+            return 0
+        return -float('inf') if outcome.winner != board.turn else float('inf')
+    return evaluate_position(board)
 
+def evaluate_position(board: chess.Board) -> int:
+    # Static evaluation without the game-over checks, for callers that
+    # already know the position is not terminal (quiescence stand-pat).
     w_mobility, w_control, w_king_safety = 5, 10, 15
-    white_score = calculate_material_score(board, chess.WHITE) + calculate_pst_score(board, chess.WHITE)
-    black_score = calculate_material_score(board, chess.BLACK) + calculate_pst_score(board, chess.BLACK)
-    white_pawn_penalty = calculate_doubled_pawn_penalty(board, chess.WHITE) + calculate_isolated_pawn_penalty(board, chess.WHITE)
-    black_pawn_penalty = calculate_doubled_pawn_penalty(board, chess.BLACK) + calculate_isolated_pawn_penalty(board, chess.BLACK)
+    if isinstance(board, EngineBoard):
+        white_score = board.material_pst_score(chess.WHITE)
+        black_score = board.material_pst_score(chess.BLACK)
+    else:
+        white_score = calculate_material_score(board, chess.WHITE) + calculate_pst_score(board, chess.WHITE)
+        black_score = calculate_material_score(board, chess.BLACK) + calculate_pst_score(board, chess.BLACK)
+    white_pawn_penalty, black_pawn_penalty, white_outposts, black_outposts = probe_pawn_structure(board)
     white_score -= white_pawn_penalty
     black_score -= black_pawn_penalty
-    white_mobility = calculate_mobility_score(board, chess.WHITE)
-    black_mobility = calculate_mobility_score(board, chess.BLACK)
+    white_score += calculate_knight_score(board, chess.WHITE, white_outposts)
+    black_score += calculate_knight_score(board, chess.BLACK, black_outposts)
+    if EVAL_CONFIG['mobility'] == 'attacks':
+        white_mobility = calculate_attack_mobility_score(board, chess.WHITE)
+        black_mobility = calculate_attack_mobility_score(board, chess.BLACK)
+    else:
+        white_mobility = calculate_mobility_score(board, chess.WHITE)
+        black_mobility = calculate_mobility_score(board, chess.BLACK)
     white_control = calculate_center_control_score(board, chess.WHITE)
     black_control = calculate_center_control_score(board, chess.BLACK)
     white_king_threat = calculate_king_safety_score(board, chess.WHITE)
@@ -197,79 +504,872 @@ def score_move(move: chess.Move, board: chess.Board) -> int:
     score = 0
     if move.promotion:
         score += PIECE_VALUES.get(move.promotion, 0)
-    if board.is_capture(move):
-        victim = board.piece_at(move.to_square)
-        attacker = board.piece_at(move.from_square)
-        if victim and attacker:
-            score += 10 * PIECE_VALUES.get(victim.piece_type, 0) - PIECE_VALUES.get(attacker.piece_type, 0)
+    victim = board.piece_type_at(move.to_square)
+    if victim:
+        attacker = board.piece_type_at(move.from_square)
+        if attacker:
+            score += 10 * PIECE_VALUES[victim] - PIECE_VALUES[attacker]
     return score
 
-def find_best_move(board: chess.Board, depth: int) -> (chess.Move, list):
-    global transposition_table
-    transposition_table = {}
+class MoveOrdering:
+    # Staged move ordering for alphabeta: TT move, then winning and equal
+    # captures and promotions (SEE >= 0) by MVV-LVA, then the two killer
+    # moves of the ply, then the losing captures, then the remaining quiet
+    # moves by history score. Stages are generated lazily,
+    # so a cutoff on the TT move never generates the rest.
+
+    MAX_PLY = 128
+
+    def __init__(self) -> None:
+        self.killers = [[None, None] for _ in range(self.MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)
+
+    def new_search(self) -> None:
+        self.killers = [[None, None] for _ in range(self.MAX_PLY)]
+        self.history = [h >> 1 for h in self.history]
+
+    def record_quiet_cutoff(self, board: chess.Board, move: chess.Move, depth: int, ply: int) -> None:
+        if ply < self.MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[board.turn * 4096 + move.from_square * 64 + move.to_square] += depth * depth
+
+    def ordered_moves(self, board: chess.Board, tt_move, ply: int):
+        if tt_move and board.is_legal(tt_move):
+            yield tt_move
+        else:
+            tt_move = None
+
+        if search_stats.profile: start = time.perf_counter()
+        tactical = [move for move in board.generate_legal_captures() if move != tt_move]
+        tactical += [
+            move for move in board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied)
+            if move != tt_move
+        ]
+        tactical.sort(key=lambda move: score_move(move, board), reverse=True)
+        good_tactical, bad_captures = [], []
+        for move in tactical:
+            # Taking an equal or more valuable piece can never lose material,
+            # so SEE is only needed when the capturer is worth more.
+            victim = board.piece_type_at(move.to_square)
+            if (not victim or PIECE_VALUES[victim] >= PIECE_VALUES[board.piece_type_at(move.from_square)]
+                    or static_exchange_eval(board, move) >= 0):
+                good_tactical.append(move)
+            else:
+                bad_captures.append(move)
+        if search_stats.profile: search_stats.movegen_time += time.perf_counter() - start
+        yield from good_tactical
+
+        killers = self.killers[ply] if ply < self.MAX_PLY else ()
+        tried_killers = []
+        for killer in killers:
+            if (killer and killer != tt_move and killer not in tried_killers
+                    and not killer.promotion and not board.is_capture(killer) and board.is_legal(killer)):
+                tried_killers.append(killer)
+                yield killer
+
+        yield from bad_captures
+
+        if search_stats.profile: start = time.perf_counter()
+        history, base = self.history, board.turn * 4096
+        quiets = [
+            move for move in board.generate_legal_moves(chess.BB_ALL, ~board.occupied_co[not board.turn])
+            if not move.promotion and not board.is_en_passant(move)
+            and move != tt_move and move not in tried_killers
+        ]
+        quiets.sort(key=lambda move: history[base + move.from_square * 64 + move.to_square], reverse=True)
+        if search_stats.profile: search_stats.movegen_time += time.perf_counter() - start
+        yield from quiets
+
+move_ordering = MoveOrdering()
+
+EXACT, LOWERBOUND, UPPERBOUND = 0, 1, 2
+TT_SCORE_BITS = 30
+TT_SCORE_OFFSET = 1 << (TT_SCORE_BITS - 1)
+TT_SCORE_INF = TT_SCORE_OFFSET - 1
+
+def encode_move(move) -> int:
+    if not move:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def decode_move(code: int):
+    if not code:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+class TranspositionTable:
+    # Preallocated two-slot buckets: slot 0 is depth-preferred, slot 1 is
+    # always-replace. Each slot is a 64-bit key plus a 64-bit packed entry:
+    # move (16 bits) | depth (8) | flag (2) | age (8) | score (30).
+
+    SLOT_BYTES = 16
+
+    def __init__(self, size_mb: int = 16) -> None:
+        self.age = 0
+        self.probes = self.hits = self.stores = 0
+        self.resize(size_mb)
+
+    def resize(self, size_mb: int) -> None:
+        slots = max(2, size_mb * 1024 * 1024 // self.SLOT_BYTES)
+        buckets = 1 << ((slots // 2).bit_length() - 1)
+        self.size_mb = size_mb
+        self.bucket_mask = buckets - 1
+        self.keys = array('Q', bytes(16 * buckets))
+        self.data = array('Q', bytes(16 * buckets))
+
+    def clear(self) -> None:
+        self.age = 0
+        self.resize(self.size_mb)
+
+    def new_search(self) -> None:
+        self.age = (self.age + 1) & 0xFF
+        self.probes = self.hits = self.stores = 0
+
+    def probe(self, key: int):
+        self.probes += 1
+        index = (key & self.bucket_mask) << 1
+        for slot in (index, index + 1):
+            if self.keys[slot] == key:
+                data = self.data[slot]
+                if not data:
+                    return None
+                self.hits += 1
+                score = (data >> 34) - TT_SCORE_OFFSET
+                if score == TT_SCORE_INF:
+                    score = float('inf')
+                elif score == -TT_SCORE_INF:
+                    score = -float('inf')
+                return score, (data >> 16) & 0xFF, (data >> 24) & 0x3, decode_move(data & 0xFFFF)
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: int, move=None) -> None:
+        self.stores += 1
+        index = (key & self.bucket_mask) << 1
+        preferred = self.data[index]
+        preferred_depth = (preferred >> 16) & 0xFF
+        preferred_current = (preferred >> 26) & 0xFF == self.age
+        if self.keys[index] == key and preferred:
+            # A shallower result (e.g. a quiescence store) must not replace a
+            # deeper one for the same position from this search. An entry
+            # left by an earlier search is replaced, or probe(), which reads
+            # slot 0 first, would keep returning it over newer results.
+            slot = index if depth >= preferred_depth or not preferred_current else index + 1
+        elif not preferred or depth >= preferred_depth or not preferred_current:
+            slot = index
+        else:
+            slot = index + 1
+        if score == float('inf'):
+            score = TT_SCORE_INF
+        elif score == -float('inf'):
+            score = -TT_SCORE_INF
+        else:
+            score = max(-TT_SCORE_INF + 1, min(TT_SCORE_INF - 1, int(score)))
+        if not move:
+            for kept in (slot, index):
+                if self.keys[kept] == key and self.data[kept] & 0xFFFF:
+                    move = decode_move(self.data[kept] & 0xFFFF)
+                    break
+        self.keys[slot] = key
+        self.data[slot] = (
+            encode_move(move) | (min(max(depth, 0), 0xFF) << 16) | (flag << 24)
+            | (self.age << 26) | ((score + TT_SCORE_OFFSET) << 34)
+        )
+
+    def hashfull(self) -> int:
+        # Permille of sampled slots written during the current search.
+        sample = min(1000, len(self.data))
+        return sum(1 for d in self.data[:sample] if d and (d >> 26) & 0xFF == self.age) * 1000 // sample
+
+# The Transposition Table (our AI's memory), kept across moves of a game
+transposition_table = TranspositionTable()
+
+class EvalCache:
+    # Static evaluations keyed by Zobrist key, in two-way buckets: a new
+    # entry goes into the first slot and pushes the previous one into the
+    # second, so each bucket keeps its two most recent positions.
+
+    def __init__(self, size: int = 1 << 16) -> None:
+        self.bucket_mask = (size >> 1) - 1
+        self.keys = array('Q', bytes(8 * size))
+        self.values = array('q', bytes(8 * size))
+        self.hits = self.probes = 0
+
+    def probe(self, key: int):
+        self.probes += 1
+        index = (key & self.bucket_mask) << 1
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        if self.keys[index + 1] == key:
+            self.hits += 1
+            return self.values[index + 1]
+        return None
+
+    def store(self, key: int, value: int) -> None:
+        index = (key & self.bucket_mask) << 1
+        if self.keys[index] != key:
+            self.keys[index + 1] = self.keys[index]
+            self.values[index + 1] = self.values[index]
+            self.keys[index] = key
+        self.values[index] = value
+
+    def clear(self) -> None:
+        size = len(self.keys)
+        self.keys = array('Q', bytes(8 * size))
+        self.values = array('q', bytes(8 * size))
+        self.hits = self.probes = 0
+
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+# Shared by all searches; clear it after changing EVAL_CONFIG.
+eval_cache = EvalCache()
+
+def cached_evaluate_position(board: chess.Board, key: int) -> int:
+    score = eval_cache.probe(key)
+    if score is None:
+        score = evaluate_position(board)
+        eval_cache.store(key, score)
+    return score
+
+class SearchTimeout(Exception):
+    pass
+
+class SearchLimits:
+    # Node/time budget for one search. alphabeta and quiescence_search call
+    # count_node(), which raises SearchTimeout once the budget is spent.
+
+    CHECK_INTERVAL = 256
+
+    def __init__(self, movetime: float = None, nodes: int = None, stop_event: threading.Event = None) -> None:
+        self.start_time = time.monotonic()
+        self.deadline = self.start_time + movetime if movetime is not None else None
+        self.max_nodes = nodes
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.enforced = True
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def exhausted(self) -> bool:
+        if self.stop_event is not None and self.stop_event.is_set():
+            return True
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+search_limits = SearchLimits()
+
+class SearchStats:
+    # Counters for the current search. With profile=True the hot paths also
+    # time evaluation, move generation and hashing (perf_counter per call).
+
+    def __init__(self, root_ply: int = 0, profile: bool = False) -> None:
+        self.root_ply = root_ply
+        self.profile = profile
+        self.start_time = time.monotonic()
+        self.depth = 0
+        self.target_depth = 0
+        self.seldepth = 0
+        self.nodes = 0
+        self.qnodes = 0
+        self.nodes_per_ply = []
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_cutoffs = 0
+        self.tb_hits = 0
+        self.eval_time = self.movegen_time = self.hash_time = 0.0
+
+    def record_node(self, ply: int, quiescence: bool) -> None:
+        if quiescence:
+            self.qnodes += 1
+        else:
+            self.nodes += 1
+        if ply >= len(self.nodes_per_ply):
+            self.nodes_per_ply.extend([0] * (ply + 1 - len(self.nodes_per_ply)))
+            self.seldepth = ply
+        self.nodes_per_ply[ply] += 1
+
+    def record_cutoff(self, move_index: int) -> None:
+        self.beta_cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+    def as_dict(self) -> dict:
+        elapsed = time.monotonic() - self.start_time
+        total_nodes = self.nodes + self.qnodes
+        return {
+            'depth': self.depth, 'seldepth': self.seldepth,
+            'nodes': total_nodes, 'main_nodes': self.nodes, 'qnodes': self.qnodes,
+            'nodes_per_ply': list(self.nodes_per_ply),
+            'time': elapsed, 'nps': int(total_nodes / elapsed) if elapsed > 0 else 0,
+            'beta_cutoffs': self.beta_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0,
+            'tt_probes': transposition_table.probes, 'tt_hits': transposition_table.hits,
+            'tt_stores': transposition_table.stores, 'tt_cutoffs': self.tt_cutoffs,
+            'tt_hit_rate': transposition_table.hits / transposition_table.probes if transposition_table.probes else 0.0,
+            'pawn_hash_hit_rate': pawn_hash_table.hits / pawn_hash_table.probes if pawn_hash_table.probes else 0.0,
+            'tb_hits': self.tb_hits,
+            'eval_cache_probes': eval_cache.probes, 'eval_cache_hit_rate': eval_cache.hit_rate(),
+            'eval_time': self.eval_time, 'movegen_time': self.movegen_time, 'hash_time': self.hash_time,
+        }
+
+search_stats = SearchStats()
+
+def begin_search(board: chess.Board, movetime: float = None, nodes: int = None,
+                 stop_event: threading.Event = None, profile: bool = False, limits: SearchLimits = None) -> None:
+    # limits, if given, replaces movetime/nodes/stop_event, so its owner can
+    # still adjust it (e.g. set a deadline) once the search has started.
+    global search_limits, search_stats
+    search_limits = limits or SearchLimits(movetime, nodes, stop_event)
+    search_stats = SearchStats(len(board.move_stack), profile)
+    eval_cache.hits = eval_cache.probes = 0
+    pawn_hash_table.hits = pawn_hash_table.probes = 0
+    move_ordering.new_search()
+
+def reset_engine() -> None:
+    # Empties every table and the move-ordering state, so that the next
+    # search does not depend on earlier, unrelated ones.
+    global move_ordering
+    transposition_table.clear()
+    pawn_hash_table.clear()
+    eval_cache.clear()
+    move_ordering = MoveOrdering()
+
+def count_node(board: chess.Board, quiescence: bool = False) -> None:
+    search_stats.record_node(len(board.move_stack) - search_stats.root_ply, quiescence)
+    search_limits.nodes += 1
+    if search_limits.enforced and search_limits.nodes % SearchLimits.CHECK_INTERVAL == 0 and search_limits.exhausted():
+        raise SearchTimeout()
+
+def search_root(board: EngineBoard, moves: list, depth: int, alpha: float, beta: float) -> (chess.Move, float, list):
+    search_stats.target_depth = depth
     best_move = None
     max_eval = -float('inf')
-    alpha, beta = -float('inf'), float('inf')
-    moves = list(board.legal_moves)
-    moves.sort(key=lambda move: score_move(move, board), reverse=True)
     move_evals = []
     for move in moves:
         board.push(move)
         eval = -alphabeta(board, depth - 1, -beta, -alpha)
         board.pop()
-        move_evals.append((board.san(move), eval))
+        move_evals.append((move, eval))
         if eval > max_eval:
             max_eval = eval
             best_move = move
             alpha = max(alpha, eval)
     move_evals.sort(key=lambda item: item[1], reverse=True)
-    return best_move, move_evals[:5]
+    return best_move, max_eval, move_evals
+
+def principal_variation(board: chess.Board, max_length: int) -> list:
+    pv = []
+    board = board.copy()
+    while len(pv) < max_length:
+        entry = transposition_table.probe(chess.polyglot.zobrist_hash(board))
+        if not entry or not entry[3] or not board.is_legal(entry[3]):
+            break
+        pv.append(entry[3])
+        board.push(entry[3])
+    return pv
+
+# Opening book and Syzygy tablebases, both optional and read from local
+# files. The book is only consulted at the root; tablebases are probed at
+# the root (DTZ, to pick a move) and inside the search (WDL, as an exact
+# score) once few enough pieces remain.
+TB_WIN = 10000
+TB_SCORES = {-2: -TB_WIN, -1: 0, 0: 0, 1: 0, 2: TB_WIN} # Cursed wins/blessed losses are 50-move draws
 
-def alphabeta(board: chess.Board, depth: int, alpha: float, beta: float) -> float:
+opening_book = None
+tablebase = None
+tablebase_pieces = 0
+
+def open_book(path: str) -> None:
+    # chess.polyglot memory-maps the .bin file and binary-searches its
+    # entries, which are sorted by Zobrist key.
+    global opening_book
+    close_book()
+    opening_book = chess.polyglot.open_reader(path)
+
+def close_book() -> None:
+    global opening_book
+    if opening_book is not None:
+        opening_book.close()
+    opening_book = None
+
+def open_tablebase(directory: str) -> int:
+    # Returns the largest piece count covered by the tables found.
+    global tablebase, tablebase_pieces
+    close_tablebase()
+    tablebase = chess.syzygy.open_tablebase(directory)
+    tablebase_pieces = max((len(name) - 1 for name in tablebase.wdl), default=0)
+    return tablebase_pieces
+
+def close_tablebase() -> None:
+    global tablebase, tablebase_pieces
+    if tablebase is not None:
+        tablebase.close()
+    tablebase, tablebase_pieces = None, 0
+
+def book_move(board: chess.Board, rng: random.Random = None):
+    # A book move picked at random in proportion to its weight, or None.
+    if opening_book is None:
+        return None
+    try:
+        return opening_book.weighted_choice(board, random=rng).move
+    except IndexError:
+        return None
+
+def in_tablebase(board: chess.Board) -> bool:
+    return (tablebase is not None and chess.popcount(board.occupied) <= tablebase_pieces
+            and not board.castling_rights)
+
+def probe_tablebase_root(board: chess.Board):
+    # All legal moves with their tablebase scores, best first: wins by the
+    # shortest distance to a zeroing move, losses by the longest. None when
+    # a table is missing.
+    ranked = []
+    try:
+        for move in board.legal_moves:
+            board.push(move)
+            try:
+                child_wdl = tablebase.probe_wdl(board)
+                child_dtz = tablebase.probe_dtz(board)
+            finally:
+                board.pop()
+            ranked.append(((child_wdl, -child_dtz), move, -TB_SCORES[child_wdl]))
+    except KeyError:
+        return None
+    ranked.sort(key=lambda item: item[0])
+    return [(move, score) for _, move, score in ranked]
+
+def probe_root(board: chess.Board):
+    # (best_move, move_evals) from the book or tablebases, or None to search.
+    move = book_move(board)
+    if move is not None:
+        board.push(move)
+        score = -evaluate_board(board)
+        board.pop()
+        return move, [(board.san(move), score)]
+    if in_tablebase(board):
+        move_evals = probe_tablebase_root(board)
+        if move_evals:
+            return move_evals[0][0], [(board.san(move), score) for move, score in move_evals[:5]]
+    return None
+
+def find_best_move(board: chess.Board, depth: int, profile: bool = False) -> (chess.Move, list):
+    # Statistics for the search are left in search_stats.
+    begin_search(board, profile=profile)
+    probed = probe_root(board)
+    if probed:
+        return probed
+    transposition_table.new_search()
+    engine_board = EngineBoard.from_board(board)
+    moves = list(engine_board.legal_moves)
+    moves.sort(key=lambda move: score_move(move, engine_board), reverse=True)
+    best_move, _, move_evals = search_root(engine_board, moves, depth, -float('inf'), float('inf'))
+    search_stats.depth = depth
+    return best_move, [(board.san(move), eval) for move, eval in move_evals[:5]]
+
+# Root-split parallel search. Each worker process keeps its own
+# transposition table for the lifetime of the pool, so it still warms up
+# across moves of a game. Workers are spawned rather than forked: callers
+# (SearchService, uci.py) run threads, and a fork can copy a lock another
+# thread holds, e.g. the stdin buffer lock, and deadlock the child.
+_process_pool = None
+_process_pool_size = 0
+
+def get_process_pool(processes: int = None) -> ProcessPoolExecutor:
+    global _process_pool, _process_pool_size
+    processes = processes or os.cpu_count() or 1
+    if _process_pool is None or _process_pool_size != processes:
+        shutdown_process_pool()
+        _process_pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        _process_pool_size = processes
+    return _process_pool
+
+def shutdown_process_pool() -> None:
+    global _process_pool, _process_pool_size
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+    _process_pool, _process_pool_size = None, 0
+
+_worker_root_key = None
+
+def _search_root_move(board: chess.Board, move: chess.Move, depth: int, alpha: float) -> float:
+    # The TT age is bumped once per root position, not per root move, so
+    # entries from sibling root moves of the same search stay current.
+    global _worker_root_key
+    begin_search(board)
+    root_key = chess.polyglot.zobrist_hash(board)
+    if root_key != _worker_root_key:
+        transposition_table.new_search()
+        _worker_root_key = root_key
+    search_stats.target_depth = depth
+    engine_board = EngineBoard.from_board(board)
+    engine_board.push(move)
+    return -alphabeta(engine_board, depth - 1, -float('inf'), -alpha)
+
+def _wait_result(future, stop_event: threading.Event = None):
+    # future.result(), or None once stop_event is set.
+    while stop_event is not None and not stop_event.is_set():
+        if wait([future], timeout=0.05)[0]:
+            return future.result()
+    return None if stop_event is not None else future.result()
+
+def find_best_move_parallel(board: chess.Board, depth: int, processes: int = None,
+                            stop_event: threading.Event = None) -> (chess.Move, list):
+    # Same contract as find_best_move. The first (best-ordered) move is
+    # searched with a full window, then its score bounds the remaining root
+    # moves, which are spread across the worker processes. Setting
+    # stop_event returns the best of the root moves finished so far.
+    probed = probe_root(board)
+    if probed:
+        return probed
+    pool = get_process_pool(processes)
+    moves = list(board.legal_moves)
+    if not moves:
+        return None, []
+    moves.sort(key=lambda move: score_move(move, board), reverse=True)
+    first_eval = _wait_result(pool.submit(_search_root_move, board, moves[0], depth, -float('inf')), stop_event)
+    if first_eval is None:
+        return moves[0], []
+    if first_eval == float('inf'):
+        # Mate: nothing can beat it, and alpha=inf leaves the other moves an empty window.
+        return moves[0], [(board.san(moves[0]), first_eval)]
+    futures = [pool.submit(_search_root_move, board, move, depth, first_eval) for move in moves[1:]]
+    move_evals = [(moves[0], first_eval)]
+    for move, future in zip(moves[1:], futures):
+        eval = _wait_result(future, stop_event)
+        if eval is not None:
+            move_evals.append((move, eval))
+        if eval is None or eval == float('inf'):
+            for pending in futures:
+                pending.cancel()
+            break
+    move_evals.sort(key=lambda item: item[1], reverse=True)
+    return move_evals[0][0], [(board.san(move), eval) for move, eval in move_evals[:5]]
+
+ASPIRATION_WINDOW = 50
+
+def search(board: chess.Board, movetime: float = None, nodes: int = None, max_depth: int = 64,
+           on_iteration=None, stop_event: threading.Event = None, profile: bool = False,
+           limits: SearchLimits = None) -> (chess.Move, list):
+    # Iterative deepening: each iteration reorders the root moves by the
+    # previous one's scores (best/PV move first) and the TT supplies the
+    # best move below the root. Only completed iterations are returned;
+    # on_iteration(info) is called after each one.
+    begin_search(board, movetime, nodes, stop_event, profile, limits)
+    probed = probe_root(board)
+    if probed:
+        return probed
+    transposition_table.new_search()
+    engine_board = EngineBoard.from_board(board)
+    moves = list(engine_board.legal_moves)
+    moves.sort(key=lambda move: score_move(move, engine_board), reverse=True)
+    best_move, move_evals = None, []
+    score = None
+    for depth in range(1, max_depth + 1):
+        search_limits.enforced = depth > 1
+        try:
+            if score is not None and abs(score) != float('inf'):
+                alpha, beta = score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+                result = search_root(engine_board, moves, depth, alpha, beta)
+                if result[1] <= alpha or result[1] >= beta:
+                    result = search_root(engine_board, moves, depth, -float('inf'), float('inf'))
+            else:
+                result = search_root(engine_board, moves, depth, -float('inf'), float('inf'))
+        except SearchTimeout:
+            break
+        best_move, score, move_evals = result
+        moves = [move for move, _ in move_evals]
+        transposition_table.store(position_key(engine_board), depth, score, EXACT, best_move)
+        search_stats.depth = depth
+        if on_iteration:
+            info = search_stats.as_dict()
+            info.update({
+                'best_move': best_move, 'score': score,
+                'move_evals': [(board.san(move), eval) for move, eval in move_evals[:5]],
+            })
+            on_iteration(info)
+        if score == float('inf') or search_limits.exhausted():
+            break
+        if search_limits.deadline is not None and search_limits.elapsed() * 2 > search_limits.deadline - search_limits.start_time:
+            break
+    return best_move, [(board.san(move), eval) for move, eval in move_evals[:5]]
+
+class SearchService:
+    # Runs search() on a worker thread so callers (the pygame loop) never
+    # block. poll() drains progress dicts posted after every completed
+    # iteration; the last one carries 'done': True and the final result.
+    # With on_update, the worker hands each dict to it instead.
+
+    def __init__(self, on_update=None) -> None:
+        self.on_update = on_update
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._cancelled = threading.Event()
+        self._updates = queue.Queue()
+        self.limits = SearchLimits()
+
+    def start(self, board: chess.Board, movetime: float = None, nodes: int = None, **options) -> None:
+        # The limits object is created here rather than on the worker thread,
+        # so set_movetime() works even before the search has begun.
+        self.cancel()
+        self._stop_event = threading.Event()
+        self._cancelled = cancelled = threading.Event()
+        self._updates = queue.Queue()
+        self.limits = SearchLimits(movetime, nodes, self._stop_event)
+        options['limits'] = self.limits
+        deliver = self.on_update or self._updates.put
+
+        def post(update):
+            # Nothing from a cancelled search reaches the caller, not even
+            # through on_update.
+            if not cancelled.is_set():
+                deliver(update)
+
+        self._thread = threading.Thread(
+            target=self._run, args=(board.copy(), options, self._stop_event, post), daemon=True
+        )
+        self._thread.start()
+
+    def set_movetime(self, movetime: float) -> None:
+        # Puts the running search on the clock from now, e.g. on ponderhit.
+        self.limits.start_time = time.monotonic()
+        self.limits.deadline = self.limits.start_time + movetime
+
+    def _run(self, board: chess.Board, options: dict, stop_event: threading.Event, post) -> None:
+        # The 'done' update is always posted unless the search was cancelled,
+        # so callers waiting on it never hang. If the search fails, it carries the last completed iteration
+        # and an 'error' message.
+        result = {'done': True, 'best_move': None, 'move_evals': [], 'error': None}
+
+        def on_iteration(info):
+            result['best_move'], result['move_evals'] = info['best_move'], info['move_evals']
+            post(info)
+
+        try:
+            result['best_move'], result['move_evals'] = search(board, on_iteration=on_iteration, stop_event=stop_event, **options)
+        except Exception as error:
+            result['error'] = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            post(result)
+
+    def stop(self) -> None:
+        # Ends the search early; the best completed iteration is still reported.
+        self._stop_event.set()
+
+    def cancel(self) -> None:
+        # Ends the search and discards anything it has not yet reported.
+        self._cancelled.set()
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._updates = queue.Queue()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self) -> list:
+        updates = []
+        while True:
+            try:
+                updates.append(self._updates.get_nowait())
+            except queue.Empty:
+                return updates
+
+# Pruning and reduction switches, so each can be measured on its own.
+SEARCH_CONFIG = {
+    'pvs': True,
+    'null_move': True,
+    'lmr': True,
+    'futility': True,
+    'check_extensions': True,
+}
+NULL_MOVE_REDUCTION = 2
+FUTILITY_MARGIN = 200
+
+def alphabeta(board: chess.Board, depth: int, alpha: float, beta: float, allow_null: bool = True) -> float:
+    count_node(board)
     original_alpha = alpha
-    board_hash = chess.polyglot.zobrist_hash(board)
-    if board_hash in transposition_table and transposition_table[board_hash]['depth'] >= depth:
-        entry = transposition_table[board_hash]
-        if entry['flag'] == 'EXACT':
-            return entry['score']
-        elif entry['flag'] == 'LOWERBOUND' and entry['score'] >= beta:
+    if search_stats.profile: start = time.perf_counter()
+    board_hash = position_key(board)
+    if search_stats.profile: search_stats.hash_time += time.perf_counter() - start
+    entry = transposition_table.probe(board_hash)
+    if entry and entry[1] >= depth:
+        tt_score, _, tt_flag, _ = entry
+        if tt_flag == EXACT:
+            search_stats.tt_cutoffs += 1
+            return tt_score
+        elif tt_flag == LOWERBOUND and tt_score >= beta:
+            search_stats.tt_cutoffs += 1
             return beta
-        elif entry['flag'] == 'UPPERBOUND' and entry['score'] <= alpha:
+        elif tt_flag == UPPERBOUND and tt_score <= alpha:
+            search_stats.tt_cutoffs += 1
             return alpha
-    if depth == 0 or board.is_game_over():
+    ply = len(board.move_stack) - search_stats.root_ply
+    # Probed only right after a capture or pawn move, where the 50-move
+    # counter the tables assume to be zero really is.
+    if ply > 0 and board.halfmove_clock == 0 and in_tablebase(board):
+        try:
+            tb_score = TB_SCORES[tablebase.probe_wdl(board)]
+        except KeyError:
+            pass
+        else:
+            search_stats.tb_hits += 1
+            transposition_table.store(board_hash, depth, tb_score, EXACT, None)
+            return tb_score
+    in_check = board.is_check()
+    search_depth = depth
+    if in_check and SEARCH_CONFIG['check_extensions'] and ply < 2 * search_stats.target_depth:
+        search_depth += 1
+    if board.is_game_over():
+        return evaluate_board(board)
+    if search_depth <= 0:
         return quiescence_search(board, alpha, beta)
-    moves = list(board.legal_moves)
-    moves.sort(key=lambda move: score_move(move, board), reverse=True)
-    for move in moves:
+
+    # Null move: if passing still fails high, a real move will too. Skipped
+    # in check and without non-pawn material, where zugzwang is likely.
+    if (SEARCH_CONFIG['null_move'] and allow_null and not in_check and search_depth >= 3
+            and beta != float('inf')
+            and board.occupied_co[board.turn] & ~board.pawns & ~board.kings):
+        board.push(chess.Move.null())
+        score = -alphabeta(board, search_depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, allow_null=False)
+        board.pop()
+        if score >= beta:
+            return beta
+
+    # Futility: at frontier nodes, quiet moves cannot lift a hopeless
+    # static eval above alpha.
+    futile = (
+        SEARCH_CONFIG['futility'] and search_depth == 1 and not in_check
+        and abs(alpha) != float('inf') and cached_evaluate_position(board, board_hash) + FUTILITY_MARGIN <= alpha
+    )
+
+    moves = move_ordering.ordered_moves(board, entry[3] if entry else None, ply)
+    best_move = None
+    for move_index, move in enumerate(moves):
+        is_quiet = not move.promotion and not board.is_capture(move)
+        if futile and move_index > 0 and is_quiet and not board.gives_check(move):
+            continue
         board.push(move)
-        score = -alphabeta(board, depth - 1, -beta, -alpha)
+        if move_index == 0 or alpha == -float('inf'):
+            score = -alphabeta(board, search_depth - 1, -beta, -alpha)
+        else:
+            reduction = 0
+            if (SEARCH_CONFIG['lmr'] and search_depth >= 3 and move_index >= 3
+                    and is_quiet and not in_check and not board.is_check()):
+                reduction = 1 if move_index < 6 else 2
+            window_beta = alpha + 1 if SEARCH_CONFIG['pvs'] else beta
+            score = -alphabeta(board, search_depth - 1 - reduction, -window_beta, -alpha)
+            if reduction and score > alpha:
+                score = -alphabeta(board, search_depth - 1, -window_beta, -alpha)
+            if SEARCH_CONFIG['pvs'] and alpha < score < beta:
+                score = -alphabeta(board, search_depth - 1, -beta, -alpha)
         board.pop()
         if score >= beta:
-            transposition_table[board_hash] = {'score': beta, 'depth': depth, 'flag': 'LOWERBOUND'}
+            search_stats.record_cutoff(move_index)
+            if is_quiet:
+                move_ordering.record_quiet_cutoff(board, move, depth, ply)
+            transposition_table.store(board_hash, depth, beta, LOWERBOUND, move)
             return beta
         if score > alpha:
             alpha = score
+            best_move = move
     if alpha <= original_alpha:
-        flag = 'UPPERBOUND'
+        flag = UPPERBOUND
     else:
-        flag = 'EXACT'
-    transposition_table[board_hash] = {'score': alpha, 'depth': depth, 'flag': flag}
+        flag = EXACT
+    transposition_table.store(board_hash, depth, alpha, flag, best_move)
     return alpha
 
-def quiescence_search(board: chess.Board, alpha: float, beta: float) -> float:
-    stand_pat_eval = evaluate_board(board)
+def static_exchange_eval(board: chess.Board, move: chess.Move) -> int:
+    # Material balance of the exchange sequence on move.to_square when both
+    # sides keep recapturing with their least valuable attacker (swap list).
+    # Pins are ignored.
+    to_square = move.to_square
+    occupied = board.occupied ^ chess.BB_SQUARES[move.from_square]
+    if board.is_en_passant(move):
+        occupied ^= chess.BB_SQUARES[to_square + (-8 if board.turn == chess.WHITE else 8)]
+        gain = [PIECE_VALUES[chess.PAWN]]
+    else:
+        gain = [PIECE_VALUES.get(board.piece_type_at(to_square), 0)]
+    on_square = move.promotion or board.piece_type_at(move.from_square)
+    if move.promotion:
+        gain[0] += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+    side = not board.turn
+    while True:
+        attackers = board.attackers_mask(side, to_square, occupied) & occupied
+        if not attackers:
+            break
+        for piece_type in chess.PIECE_TYPES:
+            candidates = attackers & board.pieces_mask(piece_type, side)
+            if candidates:
+                break
+        gain.append(PIECE_VALUES[on_square] - gain[-1])
+        on_square = piece_type
+        occupied ^= candidates & -candidates
+        side = not side
+    while len(gain) > 1:
+        last = gain.pop()
+        gain[-1] = -max(-gain[-1], last)
+    return gain[0]
+
+QSEARCH_MAX_DEPTH = 8
+DELTA_MARGIN = 200
+
+def quiescence_search(board: chess.Board, alpha: float, beta: float, qdepth: int = 0) -> float:
+    count_node(board, quiescence=True)
+    if board.is_check() and not any(board.generate_legal_moves()):
+        return -float('inf')
+    if search_stats.profile: start = time.perf_counter()
+    board_hash = position_key(board)
+    if search_stats.profile: search_stats.hash_time += time.perf_counter() - start
+    entry = transposition_table.probe(board_hash)
+    if entry:
+        tt_score, _, tt_flag, _ = entry
+        if (tt_flag == EXACT or (tt_flag == LOWERBOUND and tt_score >= beta)
+                or (tt_flag == UPPERBOUND and tt_score <= alpha)):
+            search_stats.tt_cutoffs += 1
+            return max(alpha, min(beta, tt_score))
+    original_alpha = alpha
+    if search_stats.profile: start = time.perf_counter()
+    stand_pat_eval = cached_evaluate_position(board, board_hash)
+    if search_stats.profile: search_stats.eval_time += time.perf_counter() - start
     if stand_pat_eval >= beta:
         return beta
+    # Delta pruning: not even winning a queen would lift us to alpha.
+    if stand_pat_eval + PIECE_VALUES[chess.QUEEN] + DELTA_MARGIN <= alpha or qdepth >= QSEARCH_MAX_DEPTH:
+        return max(alpha, stand_pat_eval)
     if stand_pat_eval > alpha:
         alpha = stand_pat_eval
-    capture_moves = [move for move in board.legal_moves if board.is_capture(move)]
+    if search_stats.profile: start = time.perf_counter()
+    capture_moves = []
+    for move in board.generate_legal_captures():
+        victim = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+        gain = PIECE_VALUES[victim] + (PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN] if move.promotion else 0)
+        if stand_pat_eval + gain + DELTA_MARGIN <= alpha:
+            continue
+        if PIECE_VALUES[board.piece_type_at(move.from_square)] > PIECE_VALUES[victim] and static_exchange_eval(board, move) < 0:
+            continue
+        capture_moves.append(move)
     capture_moves.sort(key=lambda move: score_move(move, board), reverse=True)
-    for move in capture_moves:
+    if search_stats.profile: search_stats.movegen_time += time.perf_counter() - start
+    best_move = None
+    for move_index, move in enumerate(capture_moves):
         board.push(move)
-        score = -quiescence_search(board, -beta, -alpha)
+        score = -quiescence_search(board, -beta, -alpha, qdepth + 1)
         board.pop()
         if score >= beta:
+            search_stats.record_cutoff(move_index)
+            transposition_table.store(board_hash, 0, beta, LOWERBOUND, move)
             return beta
         if score > alpha:
             alpha = score
-    return alpha
\ No newline at end of file
+            best_move = move
+    transposition_table.store(board_hash, 0, alpha, EXACT if alpha > original_alpha else UPPERBOUND, best_move)
+    return alpha
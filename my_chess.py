@@ -1,11 +1,13 @@
 import os, sys, pygame, chess
-from collections import deque
-from graph_ai import evaluate_board, find_best_move
+from graph_ai import evaluate_board, SearchService, open_book, open_tablebase, knight_path as knight_graph_path
 
 pygame.init()
 WIDTH, HEIGHT, SQUARE_SIZE = 600, 600, 75
 WHITE, BROWN = (240, 217, 181), (181, 136, 99)
 BUTTON_WIDTH, SIDE_PANEL_WIDTH = 180, 200
+AI_MOVETIME = 2.0 # Seconds per AI move
+FPS = 60 # Frame limiter; frames with nothing changed draw nothing
+BOOK_FILE, SYZYGY_DIR = "book.bin", "syzygy" # Optional Polyglot book and Syzygy tables
 
 PIECE_IMAGES = {}
 for p in 'prnbqkPRNBQK':
@@ -17,6 +19,11 @@ for p in 'prnbqkPRNBQK':
         img = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
     PIECE_IMAGES[p] = img
 
+if os.path.exists(BOOK_FILE):
+    open_book(BOOK_FILE)
+if os.path.isdir(SYZYGY_DIR):
+    open_tablebase(SYZYGY_DIR)
+
 board = chess.Board()
 screen = pygame.display.set_mode((WIDTH + SIDE_PANEL_WIDTH, HEIGHT))
 pygame.display.set_caption("Chess")
@@ -24,11 +31,42 @@ font, small_font = pygame.font.Font(None, 36), pygame.font.Font(None, 24)
 
 post_search_eval = 0
 ai_thoughts = []
+search_service = SearchService()
 game_message = ""
 show_knight_path = show_attack_pattern = False
 selected_square = selected_for_pattern = knight_start = knight_end = None
 knight_path = []
 
+# Retained-mode rendering: the squares and coordinates are drawn once to
+# BOARD_SURFACE, text is rendered once per string, and each frame redraws
+# and pushes to the display only the squares/panel that changed.
+BOARD_RECT = pygame.Rect(0, 0, WIDTH, HEIGHT)
+PANEL_RECT = pygame.Rect(WIDTH, 0, SIDE_PANEL_WIDTH, HEIGHT)
+label_cache = {}
+drawn_squares = [None] * 64 # What each square currently shows on screen
+drawn_board_state = drawn_overlay = drawn_panel = None
+
+def render_label(f, text, color):
+    key = (id(f), text, color)
+    label = label_cache.get(key)
+    if label is None:
+        if len(label_cache) > 512: label_cache.clear()
+        label = label_cache[key] = f.render(text, True, color)
+    return label
+
+def build_board_surface():
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    for r in range(8):
+        for c in range(8):
+            color = WHITE if (r + c) % 2 == 0 else BROWN
+            pygame.draw.rect(surface, color, (c * SQUARE_SIZE, r * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    for i in range(8):
+        surface.blit(small_font.render(str(8 - i), True, (0, 0, 0)), (5, i * SQUARE_SIZE + 5))
+        surface.blit(small_font.render(chr(97 + i), True, (0, 0, 0)), (i * SQUARE_SIZE + SQUARE_SIZE - 15, HEIGHT - 20))
+    return surface
+
+BOARD_SURFACE = build_board_surface()
+
 button_rects = {
     k: pygame.Rect(WIDTH + 10, 400 + i * 40, BUTTON_WIDTH, 30)
     for i, k in enumerate(["knight_path", "attack_pattern", "minimax_tree", "show_all"])
@@ -38,7 +76,7 @@ def draw_buttons():
     for k, r in button_rects.items():
         pygame.draw.rect(screen, (100, 100, 100), r)
         pygame.draw.rect(screen, (255, 255, 255), r, 2)
-        screen.blit(small_font.render(k.replace("_", " ").title(), True, (255, 255, 255)), (r.x + 10, r.y + 5))
+        screen.blit(render_label(small_font, k.replace("_", " ").title(), (255, 255, 255)), (r.x + 10, r.y + 5))
 
 def handle_button_click(pos):
     global show_knight_path, show_attack_pattern, knight_path, knight_start, knight_end, selected_for_pattern
@@ -52,44 +90,28 @@ def handle_button_click(pos):
 def draw_eval_bar():
     bar_x, bar_w = WIDTH + 160, 20
     pygame.draw.rect(screen, (0, 0, 0), (bar_x, 0, bar_w, HEIGHT))
-    eval_for_white = -post_search_eval if board.turn == chess.WHITE else post_search_eval
+    eval_for_white = -post_search_eval # Evals are from the AI's (black's) side, also while it is still thinking
     eval_for_white_normalized = max(min(eval_for_white, 500), -500) / 500
     white_bar_height = int(((eval_for_white_normalized + 1) / 2) * HEIGHT)
     pygame.draw.rect(screen, (255, 255, 255), (bar_x, HEIGHT - white_bar_height, bar_w, white_bar_height))
     pygame.draw.rect(screen, (80, 80, 80), (bar_x, 0, bar_w, HEIGHT - white_bar_height))
 
 def draw_ai_thought_panel():
-    screen.blit(font.render("AI Thoughts", True, (255, 255, 255)), (WIDTH + 10, 10))
+    screen.blit(render_label(font, "AI Thoughts", (255, 255, 255)), (WIDTH + 10, 10))
     for i, (move_san, eval_score) in enumerate(ai_thoughts):
         y = 50 + 40 * i
         text_color = (220, 220, 100) if eval_score == ai_thoughts[0][1] else (180, 180, 180)
-        screen.blit(small_font.render(f"{i+1}. {move_san}", True, text_color), (WIDTH + 10, y))
-        screen.blit(small_font.render(f"{eval_score/100.0:+.2f}", True, text_color), (WIDTH + 100, y))
+        screen.blit(render_label(small_font, f"{i+1}. {move_san}", text_color), (WIDTH + 10, y))
+        screen.blit(render_label(small_font, f"{eval_score/100.0:+.2f}", text_color), (WIDTH + 100, y))
 
 def draw_side_panel():
-    panel_rect = pygame.Rect(WIDTH, 0, SIDE_PANEL_WIDTH, HEIGHT)
-    pygame.draw.rect(screen, (30, 30, 30), panel_rect)
+    pygame.draw.rect(screen, (30, 30, 30), PANEL_RECT)
     draw_ai_thought_panel()
     draw_eval_bar()
     draw_buttons()
 
 def knight_shortest_path(start, end):
-    dirs = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
-    queue, visited = deque([[start]]), set()
-    while queue:
-        path = queue.popleft()
-        curr = path[-1]
-        if curr == end: return path
-        if curr in visited: continue
-        visited.add(curr)
-        r, c = divmod(curr, 8)
-        for dr, dc in dirs:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < 8 and 0 <= nc < 8:
-                next_sq = nr * 8 + nc
-                if next_sq not in visited:
-                    queue.append(path + [next_sq])
-    return []
+    return knight_graph_path(start, end) # Walks graph_ai's precomputed predecessor table
 
 def draw_graph_path(path, color):
     pts = [(chess.square_file(sq) * SQUARE_SIZE + SQUARE_SIZE // 2, (7 - chess.square_rank(sq)) * SQUARE_SIZE + SQUARE_SIZE // 2) for sq in path]
@@ -105,31 +127,31 @@ def draw_attack_pattern(square):
         pygame.draw.circle(screen, (255, 0, 0), (x, y), 6)
         pygame.draw.line(screen, (255, 0, 0), (sx, sy), (x, y), 2)
 
-def draw_board():
-    for r in range(8):
-        for c in range(8):
-            sq = chess.square(c, 7 - r)
-            rect = pygame.Rect(c * SQUARE_SIZE, r * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
-            color = WHITE if (r + c) % 2 == 0 else BROWN
-            pygame.draw.rect(screen, color, rect)
-            if selected_square == sq:
-                pygame.draw.rect(screen, (0, 255, 0), rect, 3)
-            elif selected_square and chess.Move(selected_square, sq) in board.legal_moves:
-                pygame.draw.circle(screen, (0, 0, 255), tuple(map(int, rect.center)), 10)
-    for i in range(8):
-        screen.blit(small_font.render(str(8 - i), True, (0, 0, 0)), (5, i * SQUARE_SIZE + 5))
-        screen.blit(small_font.render(chr(97 + i), True, (0, 0, 0)), (i * SQUARE_SIZE + SQUARE_SIZE - 15, HEIGHT - 20))
+def square_rect(sq):
+    return pygame.Rect(chess.square_file(sq) * SQUARE_SIZE, (7 - chess.square_rank(sq)) * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
 
-def draw_pieces():
-    for r in range(8):
-        for c in range(8):
-            sq = chess.square(c, 7 - r)
-            p = board.piece_at(sq)
-            if p: screen.blit(PIECE_IMAGES[p.symbol()], (c * SQUARE_SIZE, r * SQUARE_SIZE))
+def square_contents(targets):
+    # Per square: (piece symbol, selected, legal target), compared frame to frame.
+    contents = []
+    for sq in chess.SQUARES:
+        p = board.piece_at(sq)
+        contents.append((p.symbol() if p else None, sq == selected_square, sq in targets))
+    return contents
+
+def draw_square(sq, contents):
+    symbol, selected, target = contents
+    rect = square_rect(sq)
+    screen.blit(BOARD_SURFACE, rect, rect)
+    if selected:
+        pygame.draw.rect(screen, (0, 255, 0), rect, 3)
+    elif target:
+        pygame.draw.circle(screen, (0, 0, 255), rect.center, 10)
+    if symbol: screen.blit(PIECE_IMAGES[symbol], rect)
+    return rect
 
 def draw_message():
     if game_message:
-        text = font.render(game_message, True, (255, 255, 255))
+        text = render_label(font, game_message, (255, 255, 255))
         text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
         pygame.draw.rect(screen, (0,0,0,150), text_rect.inflate(20,20))
         screen.blit(text, text_rect)
@@ -159,8 +181,45 @@ def check_game_status():
     else:
         game_message = ""
         
+def render():
+    # Draws what changed since the last frame and returns the dirty rects.
+    global drawn_board_state, drawn_overlay, drawn_panel
+    dirty = []
+    board_state = (board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK], board.pawns, board.knights,
+                   board.bishops, board.rooks, board.queens, board.kings, selected_square)
+    overlay = (game_message, tuple(knight_path) if show_knight_path else (), selected_for_pattern if show_attack_pattern else None)
+    if board_state != drawn_board_state or overlay != drawn_overlay:
+        # Targets come from one pass over the legal moves, not a lookup per square.
+        targets = {m.to_square for m in board.legal_moves if m.from_square == selected_square} if selected_square is not None else set()
+        contents = square_contents(targets)
+        # Overlays span several squares, so while one is (or was) up the whole board is redrawn.
+        full = overlay != drawn_overlay or any(overlay)
+        for sq in chess.SQUARES:
+            if full or contents[sq] != drawn_squares[sq]:
+                rect = draw_square(sq, contents[sq])
+                drawn_squares[sq] = contents[sq]
+                if not full: dirty.append(rect)
+        if full:
+            if show_knight_path and knight_path: draw_graph_path(knight_path, (0, 255, 255))
+            if show_attack_pattern and selected_for_pattern: draw_attack_pattern(selected_for_pattern)
+            draw_message()
+            dirty.append(BOARD_RECT)
+        drawn_board_state, drawn_overlay = board_state, overlay
+    panel = (tuple(ai_thoughts), post_search_eval)
+    if panel != drawn_panel:
+        draw_side_panel()
+        drawn_panel = panel
+        dirty.append(PANEL_RECT)
+    return dirty
+
+def invalidate():
+    # Forces a full redraw, e.g. after the window was uncovered.
+    global drawn_board_state, drawn_overlay, drawn_panel
+    drawn_board_state = drawn_overlay = drawn_panel = None
+    drawn_squares[:] = [None] * 64
+
 def handle_click(pos):
-    global selected_square, knight_path, selected_for_pattern, knight_start, knight_end, ai_thoughts, post_search_eval
+    global selected_square, knight_path, selected_for_pattern, knight_start, knight_end
     if board.is_game_over() or board.turn == chess.BLACK: return # Prevent clicks during AI's turn
     col, row = pos[0] // SQUARE_SIZE, pos[1] // SQUARE_SIZE
     sq = chess.square(col, 7 - row)
@@ -183,50 +242,55 @@ def handle_click(pos):
         if move in board.legal_moves:
             board.push(move)
             check_game_status()
-            draw_board(); draw_pieces(); draw_side_panel(); pygame.display.flip() # Redraw after player moves
-            
             if not board.is_game_over():
-                ai_move, thoughts = find_best_move(board, 4) # Set search depth
-                ai_thoughts = thoughts
-                if thoughts:
-                    post_search_eval = thoughts[0][1]
-                if ai_move:
-                    board.push(ai_move)
-                check_game_status()
+                search_service.start(board, movetime=AI_MOVETIME) # AI thinks in the background
         selected_square = None
-        
+
+def handle_search_updates():
+    global ai_thoughts, post_search_eval, game_message
+    for update in search_service.poll():
+        if update['move_evals']:
+            ai_thoughts = update['move_evals']
+            post_search_eval = ai_thoughts[0][1]
+        if update.get('done'):
+            if update['best_move']:
+                board.push(update['best_move'])
+            check_game_status()
+            if update.get('error') and not update['best_move']:
+                game_message = "AI failed - press U to undo"
+
 running = True
+clock = pygame.time.Clock()
 # AI plays if it's black's turn to start
 if board.turn == chess.BLACK:
-    ai_move, thoughts = find_best_move(board, 4)
-    ai_thoughts = thoughts
-    if thoughts:
-        post_search_eval = thoughts[0][1]
-    if ai_move:
-        board.push(ai_move)
-    check_game_status()
+    search_service.start(board, movetime=AI_MOVETIME)
 
 while running:
-    draw_board()
-    draw_pieces()
-    draw_side_panel()
-    draw_message()
-    if show_knight_path and knight_path: draw_graph_path(knight_path, (0, 255, 255))
-    if show_attack_pattern and selected_for_pattern: draw_attack_pattern(selected_for_pattern)
-    pygame.display.flip()
-    
+    handle_search_updates()
+    dirty = render()
+    if dirty: pygame.display.update(dirty)
+
+
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
+        elif event.type == pygame.VIDEOEXPOSE:
+            invalidate()
         elif event.type == pygame.MOUSEBUTTONDOWN:
             if event.pos[0] >= WIDTH:
                 handle_button_click(event.pos)
             else:
                 handle_click(event.pos)
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_u:
-            if board.move_stack: board.pop()
-            if board.move_stack: board.pop()
+            search_service.cancel() # Drop any search in progress or result not yet applied
+            if board.turn == chess.BLACK:
+                if board.move_stack: board.pop() # Undo mid-search: only the player's move is on the board
+            else:
+                if board.move_stack: board.pop()
+                if board.move_stack: board.pop()
             check_game_status()
             ai_thoughts = []; post_search_eval = 0
+    clock.tick(FPS)
 
+search_service.cancel()
 pygame.quit()   
\ No newline at end of file
@@ -0,0 +1,267 @@
+import os
+import sys
+import threading
+import time
+
+import chess
+
+import graph_ai
+
+# UCI front-end for graph_ai, for GUIs and match runners:
+#
+#   python uci.py
+#
+# Searches run on a SearchService worker thread so "stop" and "ponderhit"
+# are handled while the engine thinks.
+
+ENGINE_NAME = "graph_ai"
+MOVE_OVERHEAD = 0.05 # Seconds kept back per move for I/O latency
+DEFAULT_MOVES_TO_GO = 30
+
+def format_score(score: float, pv: list) -> str:
+    if abs(score) == float('inf'):
+        mate_in = max(1, (len(pv) + 1) // 2)
+        return f"mate {mate_in if score > 0 else -mate_in}"
+    return f"cp {int(score)}"
+
+def allocate_time(board: chess.Board, params: dict):
+    # Seconds to spend on this move, or None for no time limit.
+    if 'movetime' in params:
+        return max(0.01, params['movetime'] / 1000 - MOVE_OVERHEAD)
+    remaining = params.get('wtime' if board.turn == chess.WHITE else 'btime')
+    if remaining is None:
+        return None
+    increment = params.get('winc' if board.turn == chess.WHITE else 'binc', 0)
+    moves_to_go = params.get('movestogo') or DEFAULT_MOVES_TO_GO
+    budget = remaining / moves_to_go + increment * 0.75
+    budget = min(budget, remaining * 0.5)
+    return max(0.01, budget / 1000 - MOVE_OVERHEAD)
+
+def principal_variation(board: chess.Board, best_move: chess.Move, max_length: int) -> list:
+    # The searched best move, then the TT line from the position after it.
+    # The root TT entry is not trusted to hold best_move.
+    board = board.copy(stack=False)
+    board.push(best_move)
+    return [best_move] + graph_ai.principal_variation(board, max_length - 1)
+
+class UCIEngine:
+
+    def __init__(self, output=sys.stdout) -> None:
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.board = chess.Board()
+        self.threads = 1
+        self.service = graph_ai.SearchService(on_update=self.on_search_update)
+        self.search_board = None
+        self.pending_movetime = None
+        # While pondering or in "go infinite", bestmove is held until
+        # "stop" or "ponderhit", as the protocol requires.
+        self.hold_bestmove = False
+        self.held_bestmove = None
+        self.state_lock = threading.Lock()
+        # (thread, stop_event) of a running multi-process search.
+        self.parallel_search = None
+
+    def send(self, line: str) -> None:
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line: str) -> bool:
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'quit':
+            self.cancel_search()
+            return False
+        handler = getattr(self, 'cmd_' + command, None)
+        if handler:
+            handler(args)
+        return True
+
+    def cmd_uci(self, args: list) -> None:
+        self.send(f"id name {ENGINE_NAME}")
+        self.send("id author graph_ai authors")
+        self.send(f"option name Hash type spin default {graph_ai.transposition_table.size_mb} min 1 max 4096")
+        self.send(f"option name Threads type spin default 1 min 1 max {os.cpu_count() or 1}")
+        self.send("option name Ponder type check default false")
+        self.send("option name BookFile type string default <empty>")
+        self.send("option name SyzygyPath type string default <empty>")
+        self.send("uciok")
+
+    def cmd_isready(self, args: list) -> None:
+        self.send("readyok")
+
+    def cancel_search(self) -> None:
+        # Ends any running search and waits for it, without reporting it.
+        self.service.cancel()
+        with self.state_lock:
+            parallel, self.parallel_search = self.parallel_search, None
+        if parallel is not None:
+            thread, stop_event = parallel
+            stop_event.set()
+            thread.join()
+
+    def cmd_ucinewgame(self, args: list) -> None:
+        self.cancel_search()
+        graph_ai.transposition_table.clear()
+        graph_ai.pawn_hash_table.clear()
+        graph_ai.eval_cache.clear()
+
+    def cmd_setoption(self, args: list) -> None:
+        if 'name' not in args:
+            return
+        value_index = args.index('value') if 'value' in args else len(args)
+        name = ' '.join(args[args.index('name') + 1:value_index]).lower()
+        value = ' '.join(args[value_index + 1:])
+        if name == 'hash' and value.isdigit():
+            graph_ai.transposition_table.resize(max(1, int(value)))
+        elif name == 'threads' and value.isdigit():
+            self.threads = max(1, int(value))
+        elif name == 'bookfile':
+            self.set_path_option(value, graph_ai.open_book, graph_ai.close_book)
+        elif name == 'syzygypath':
+            self.set_path_option(value, graph_ai.open_tablebase, graph_ai.close_tablebase)
+
+    def set_path_option(self, value: str, open_fn, close_fn) -> None:
+        self.cancel_search()
+        if not value or value == '<empty>':
+            close_fn()
+            return
+        try:
+            open_fn(value)
+        except (OSError, ValueError) as error:
+            close_fn()
+            self.send(f"info string could not open {value}: {error}")
+
+    def cmd_position(self, args: list) -> None:
+        if not args:
+            return
+        moves_index = args.index('moves') if 'moves' in args else len(args)
+        try:
+            if args[0] == 'startpos':
+                board = chess.Board()
+            elif args[0] == 'fen':
+                board = chess.Board(' '.join(args[1:moves_index]))
+            else:
+                return
+            for uci_move in args[moves_index + 1:]:
+                board.push_uci(uci_move)
+        except ValueError as error:
+            # Keep the engine alive and the previous position in place.
+            self.send(f"info string invalid position: {error}")
+            return
+        self.board = board
+
+    def cmd_go(self, args: list) -> None:
+        params, index = {}, 0
+        flags = {'infinite', 'ponder'}
+        while index < len(args):
+            key = args[index]
+            if key in flags:
+                params[key] = True
+                index += 1
+            elif index + 1 < len(args) and args[index + 1].lstrip('-').isdigit():
+                params[key] = int(args[index + 1])
+                index += 2
+            else:
+                index += 1
+
+        self.cancel_search()
+        self.search_board = self.board.copy()
+        movetime = allocate_time(self.board, params)
+        with self.state_lock:
+            self.hold_bestmove = bool(params.get('infinite') or params.get('ponder'))
+            self.held_bestmove = None
+            self.pending_movetime = movetime if params.get('ponder') else None
+        if self.threads > 1 and 'depth' in params and movetime is None and not self.hold_bestmove:
+            stop_event = threading.Event()
+            thread = threading.Thread(target=self.run_parallel, args=(self.search_board, params['depth'], stop_event), daemon=True)
+            self.parallel_search = (thread, stop_event)
+            thread.start()
+            return
+        limits = {'max_depth': params.get('depth', 64)}
+        if movetime is not None and not params.get('ponder') and not params.get('infinite'):
+            limits['movetime'] = movetime
+        if 'nodes' in params:
+            limits['nodes'] = params['nodes']
+        self.service.start(self.search_board, **limits)
+
+    def run_parallel(self, board: chess.Board, depth: int, stop_event: threading.Event) -> None:
+        start = time.monotonic()
+        best_move, move_evals = graph_ai.find_best_move_parallel(board, depth, self.threads, stop_event)
+        with self.state_lock:
+            # Cancelled (by "go", "ucinewgame" or "quit"): report nothing.
+            if self.parallel_search is None or self.parallel_search[1] is not stop_event:
+                return
+            self.parallel_search = None
+            if best_move and move_evals:
+                elapsed = max(time.monotonic() - start, 1e-6)
+                self.send(f"info depth {depth} time {int(elapsed * 1000)} score {format_score(move_evals[0][1], [best_move])} pv {best_move.uci()}")
+            self.send_bestmove(best_move, board)
+
+    def cmd_stop(self, args: list) -> None:
+        with self.state_lock:
+            self.hold_bestmove = False
+            held = self.held_bestmove
+            self.held_bestmove = None
+        if held is not None:
+            self.send_bestmove(*held)
+        else:
+            self.service.stop()
+            parallel = self.parallel_search
+            if parallel is not None:
+                parallel[1].set()
+
+    def cmd_ponderhit(self, args: list) -> None:
+        # The opponent played the expected move: keep searching, now on the clock.
+        with self.state_lock:
+            self.hold_bestmove = False
+            held = self.held_bestmove
+            self.held_bestmove = None
+            movetime = self.pending_movetime
+        if held is not None:
+            self.send_bestmove(*held)
+        elif movetime is not None:
+            self.service.set_movetime(movetime)
+        else:
+            self.service.stop()
+
+    def on_search_update(self, update: dict) -> None:
+        board = self.search_board
+        if update.get('done'):
+            with self.state_lock:
+                if self.hold_bestmove:
+                    self.held_bestmove = (update['best_move'], board)
+                    return
+            self.send_bestmove(update['best_move'], board)
+            return
+        pv = principal_variation(board, update['best_move'], update['depth'])
+        self.send(
+            f"info depth {update['depth']} seldepth {update['seldepth']} "
+            f"score {format_score(update['score'], pv)} nodes {update['nodes']} "
+            f"nps {update['nps']} time {int(update['time'] * 1000)} "
+            f"hashfull {graph_ai.transposition_table.hashfull()} "
+            f"pv {' '.join(move.uci() for move in pv)}"
+        )
+
+    def send_bestmove(self, best_move, board: chess.Board) -> None:
+        if best_move is None:
+            self.send("bestmove 0000")
+            return
+        line = f"bestmove {best_move.uci()}"
+        pv = principal_variation(board, best_move, 2)
+        if len(pv) == 2:
+            line += f" ponder {pv[1].uci()}"
+        self.send(line)
+
+def main() -> None:
+    engine = UCIEngine()
+    for line in sys.stdin:
+        if not engine.handle(line.strip()):
+            break
+    engine.cancel_search()
+
+if __name__ == '__main__':
+    main()